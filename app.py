@@ -1,31 +1,54 @@
 import bcrypt
+import click
 import os
+import threading
+import weakref
 from datetime import datetime
-from flask import Flask, render_template, jsonify, request, redirect, url_for, flash, session
+from decimal import Decimal, ROUND_HALF_UP
+from flask import Flask, Blueprint, render_template, stream_template, jsonify, request, redirect, url_for, flash, get_flashed_messages, session
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, UserMixin, login_user, logout_user, current_user, login_required
-from sqlalchemy import CheckConstraint, UniqueConstraint, func, cast, Date
+from sqlalchemy import CheckConstraint, UniqueConstraint, func, cast, Date, inspect, select, literal, extract
 import math # Needed for EMI calculation
 
-# --- Configuration ---
-app = Flask(__name__)
-app.secret_key = 'your_super_secret_key_here_for_sessions'
+from config import config_by_name
 
-# --- Database Configuration ---
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///new_expense_tracker.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-
-db = SQLAlchemy(app)
+# --- Extensions (bound to an app inside create_app) ---
+db = SQLAlchemy()
 login_manager = LoginManager()
-login_manager.init_app(app)
-login_manager.login_view = 'login'
+login_manager.login_view = 'main.login'
 login_manager.login_message_category = 'info'
 login_manager.login_message = 'Please log in to access this page.'
 
+bp = Blueprint('main', __name__)
+
+# Apps built by create_app(), so forked workers can drop inherited pool connections
+_created_apps = weakref.WeakSet()
+
 @login_manager.user_loader
 def load_user(user_id):
     return User.query.get(int(user_id))
 
+# --- Money Helpers ---
+# Expense and bill amounts are stored as integer paise. Sums and maxima are computed
+# in SQL on integers; rupee strings are produced only when rendering or serializing.
+
+def to_paise(value):
+    """Parses a rupee amount (form string or number) into integer paise, rounding half up."""
+    return int((Decimal(str(value)) * 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+@bp.app_template_filter('rupees')
+def format_rupees(paise):
+    """Formats integer paise as a rupee string, e.g. 123456 -> '1234.56'."""
+    paise = int(paise or 0)
+    sign = '-' if paise < 0 else ''
+    rupees, rem = divmod(abs(paise), 100)
+    return f'{sign}{rupees}.{rem:02d}'
+
+def paise_to_rupees(paise):
+    """Converts integer paise to a JSON number in rupees."""
+    return int(paise or 0) / 100
+
 # --- Database Models (RESTORED/MODIFIED) ---
 
 class FinancialPlan(db.Model):
@@ -73,70 +96,427 @@ class Expense(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
     category_id = db.Column(db.Integer, db.ForeignKey('categories.id', ondelete='SET NULL'), nullable=True)
-    amount = db.Column(db.Numeric(10, 2), nullable=False)
+    amount_paise = db.Column(db.BigInteger, nullable=False)
     date = db.Column(db.Date, nullable=False, default=datetime.utcnow)
     description = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    __table_args__ = (CheckConstraint(amount > 0, name='positive_amount'),)
+    __table_args__ = (
+        CheckConstraint(amount_paise > 0, name='positive_amount'),
+        db.Index('ix_expenses_user_category_date', 'user_id', 'category_id', 'date'),
+    )
 
 class Bill(db.Model):
     __tablename__ = 'bills'
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
     category_id = db.Column(db.Integer, db.ForeignKey('categories.id', ondelete='SET NULL'), nullable=True)
-    amount = db.Column(db.Numeric(10, 2), nullable=False)
+    amount_paise = db.Column(db.BigInteger, nullable=False)
     due_date = db.Column(db.Date, nullable=False)
     description = db.Column(db.Text)
     is_paid = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    __table_args__ = (db.Index('ix_bills_user_unpaid_due', 'user_id', 'is_paid', 'due_date'),)
+
+class BillSection(db.Model):
+    """Maps a bill category name to the section it is grouped under on the bills page."""
+    __tablename__ = 'bill_sections'
+    id = db.Column(db.Integer, primary_key=True)
+    section = db.Column(db.String(100), nullable=False)
+    category_name = db.Column(db.String(100), unique=True, nullable=False)
+    position = db.Column(db.Integer, nullable=False, default=0)
+
+# --- Archival (Tiered Storage) Models ---
+# Expenses older than ARCHIVE_HORIZON_YEARS live in per-year `expenses_archive_<year>`
+# tables. ExpenseYearSummary keeps their per-month, per-category totals so pages can
+# report full-history figures from the hot table plus these summaries.
+
+class ExpenseYearSummary(db.Model):
+    __tablename__ = 'expense_year_summaries'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    year = db.Column(db.Integer, nullable=False)
+    month = db.Column(db.Integer, nullable=False)
+    category_id = db.Column(db.Integer, db.ForeignKey('categories.id', ondelete='SET NULL'), nullable=True)
+    total_paise = db.Column(db.BigInteger, nullable=False, default=0)
+    max_paise = db.Column(db.BigInteger, nullable=False, default=0)
+    expense_count = db.Column(db.Integer, nullable=False, default=0)
+    __table_args__ = (db.Index('ix_expense_year_summaries_user_year', 'user_id', 'year'),)
+
+# Guards defining archive tables on the shared metadata from concurrent requests
+_archive_tables_lock = threading.Lock()
+
+def archive_table(year):
+    """Returns the table holding archived expenses for `year`, defining it on first use."""
+    name = f'expenses_archive_{int(year)}'
+    table = db.metadata.tables.get(name)
+    if table is not None:
+        return table
+
+    with _archive_tables_lock:
+        table = db.metadata.tables.get(name)
+        if table is not None:
+            return table
+        return db.Table(
+            name,
+            db.Column('id', db.Integer, primary_key=True),
+            # Original expenses.id; SQLite may reuse ids once rows leave the hot table
+            db.Column('expense_id', db.Integer, nullable=False),
+            db.Column('user_id', db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+            db.Column('category_id', db.Integer, db.ForeignKey('categories.id', ondelete='SET NULL'), nullable=True),
+            db.Column('amount_paise', db.BigInteger, nullable=False),
+            db.Column('date', db.Date, nullable=False),
+            db.Column('description', db.Text),
+            db.Column('created_at', db.DateTime),
+            db.Index(f'ix_{name}_user_date', 'user_id', 'date'),
+        )
 
 # --- Initialization (Cleaned up) ---
-def init_db():
+DEFAULT_CATEGORIES = [
+    'Food',
+    'Shopping',
+    'Rent/Mortgage',
+    'Healthcare',
+    'Transportation',
+    'Electricity',
+    'Water/Gas',
+    'Internet/Phone',
+    'Savings & Debt',
+    'Savings', 
+]
+
+# Legacy system categories that should no longer exist
+REMOVED_CATEGORIES = ['Miscellaneous']
+
+# (section, category name) in display order; the first category of a section receives its new reminders
+DEFAULT_BILL_SECTIONS = [
+    ('House Rent & Mortgage', 'Rent/Mortgage'),
+    ('Electricity Bill',      'Electricity'),
+    ('Water & Gas Bill',      'Water/Gas'),
+    ('Internet & Phone',      'Internet/Phone'),
+]
+
+def seed_default_categories():
+    """Ensures the system categories exist. Safe to run repeatedly; uses one query and one commit."""
+    existing = {
+        c.name: c for c in Category.query.filter(
+            Category.user_id.is_(None),
+            Category.name.in_(DEFAULT_CATEGORIES + REMOVED_CATEGORIES)
+        ).all()
+    }
+
+    missing = [Category(name=name, user_id=None) for name in DEFAULT_CATEGORIES if name not in existing]
+    stale = [existing[name] for name in REMOVED_CATEGORIES if name in existing]
+
+    if not missing and not stale:
+        return False
+
+    db.session.add_all(missing)
+    for cat in stale:
+        db.session.delete(cat)
+    db.session.commit()
+    return True
+
+def seed_bill_sections():
+    """Ensures the category -> section table holds the default bill sections. Safe to run repeatedly."""
+    existing = {name for (name,) in db.session.query(BillSection.category_name).all()}
+    missing = [
+        BillSection(section=section, category_name=name, position=position)
+        for position, (section, name) in enumerate(DEFAULT_BILL_SECTIONS)
+        if name not in existing
+    ]
+    if not missing:
+        return False
+
+    db.session.add_all(missing)
+    db.session.commit()
+    return True
+
+def _copy_legacy_amounts(model, legacy, rename):
+    """
+    Moves rows from `legacy` (old Numeric `amount` column) into the model's table
+    as integer paise, then drops `legacy`. With `rename`, the current table is
+    first renamed to `legacy`. Everything runs in one explicit transaction:
+    pysqlite would otherwise commit the DDL before the copy.
+    """
+    table = model.__tablename__
+    paise = 'CAST(ROUND(amount * 100) AS INTEGER)'
+
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        conn.exec_driver_sql('BEGIN')
+        try:
+            if rename:
+                conn.exec_driver_sql(f'ALTER TABLE {table} RENAME TO {legacy}')
+            model.__table__.create(conn, checkfirst=True)
+            if conn.execute(select(func.count()).select_from(model.__table__)).scalar():
+                raise RuntimeError(
+                    f"Both {table} and {legacy} contain rows; merge them by hand, "
+                    f"then drop {legacy} and re-run init-db."
+                )
+
+            columns = [c['name'] for c in inspect(conn).get_columns(legacy)]
+            kept = ', '.join(c for c in columns if c != 'amount' and c in model.__table__.c)
+
+            # The old column accepted positive amounts below half a paisa; keep them as 1 paisa
+            clamped = conn.exec_driver_sql(f'SELECT COUNT(*) FROM {legacy} WHERE {paise} < 1').scalar()
+            conn.exec_driver_sql(
+                f'INSERT INTO {table} ({kept}, amount_paise) '
+                f'SELECT {kept}, CASE WHEN {paise} < 1 THEN 1 ELSE {paise} END FROM {legacy}'
+            )
+            conn.exec_driver_sql(f'DROP TABLE {legacy}')
+            conn.exec_driver_sql('COMMIT')
+        except Exception:
+            conn.exec_driver_sql('ROLLBACK')
+            raise
+
+    if clamped:
+        print(f"Warning: {clamped} {table} row(s) below 0.005 were stored as 0.01.")
+    print(f"Migrated {table}.amount to integer paise.")
+
+def migrate_amounts_to_paise():
+    """
+    Rebuilds expenses/bills tables created with the old Numeric(10, 2) `amount`
+    column so they store integer `amount_paise` instead. Resumes a migration
+    that left a `*_legacy_amount` table behind; does nothing once migrated.
+    """
+    inspector = inspect(db.engine)
+    existing_tables = inspector.get_table_names()
+
+    for model in (Expense, Bill):
+        table = model.__tablename__
+        legacy = f'{table}_legacy_amount'
+        if legacy in existing_tables:
+            _copy_legacy_amounts(model, legacy, rename=False)
+            continue
+        if table not in existing_tables:
+            continue
+        columns = [c['name'] for c in inspector.get_columns(table)]
+        if 'amount_paise' in columns or 'amount' not in columns:
+            continue
+        _copy_legacy_amounts(model, legacy, rename=True)
+
+def pending_migration():
+    """Describes why the database still needs `flask init-db`, or returns None if it is current."""
+    inspector = inspect(db.engine)
+    existing_tables = inspector.get_table_names()
+
+    for model in (Expense, Bill):
+        table = model.__tablename__
+        if f'{table}_legacy_amount' in existing_tables:
+            return f'an interrupted migration left {table}_legacy_amount behind'
+        if table in existing_tables and 'amount_paise' not in [c['name'] for c in inspector.get_columns(table)]:
+            return f'{table} still stores the old Numeric amount column'
+    return None
+
+def init_db(app):
     with app.app_context():
-        # IMPORTANT: When the schema changes, you must delete the old .db file first.
+        migrate_amounts_to_paise()
         db.create_all() 
-        
-        # Define the desired categories
-        default_categories = [
-            'Food',
-            'Shopping',
-            'Rent/Mortgage',
-            'Healthcare',
-            'Transportation',
-            'Electricity',
-            'Water/Gas',
-            'Internet/Phone',
-            'Savings & Debt',
-            'Savings', 
-        ]
-        
-        # Ensure all required categories exist
-        for name in default_categories:
-            if not Category.query.filter_by(name=name, user_id=None).first():
-                db.session.add(Category(name=name, user_id=None))
-                db.session.commit()
-                
-        # Remove any unwanted legacy categories if needed
-        misc_cat = Category.query.filter_by(name='Miscellaneous', user_id=None).first()
-        if misc_cat:
-            db.session.delete(misc_cat)
-            db.session.commit()
-            
+        # create_all() skips existing tables, so add indexes introduced since they were created
+        for model in (Expense, Bill):
+            for index in model.__table__.indexes:
+                index.create(db.engine, checkfirst=True)
+        seed_default_categories()
+        seed_bill_sections()
         print("Default categories ensured.")
 
-            
+def archive_cutoff(horizon_years, today=None):
+    """First date kept in the hot table: January 1st of the oldest of the last `horizon_years` years."""
+    if horizon_years < 1:
+        raise ValueError('horizon_years must be at least 1 (the current year is always kept).')
+    today = today or datetime.now().date()
+    return datetime(today.year - horizon_years + 1, 1, 1).date()
+
+def _rebuild_year_summary(year):
+    """Recomputes the ExpenseYearSummary rows of `year` from its archive table."""
+    table = archive_table(year)
+    summaries = ExpenseYearSummary.__table__
+    month = extract('month', table.c.date)
+
+    db.session.execute(summaries.delete().where(summaries.c.year == year))
+    db.session.execute(summaries.insert().from_select(
+        ['user_id', 'year', 'month', 'category_id', 'total_paise', 'max_paise', 'expense_count'],
+        select(
+            table.c.user_id,
+            literal(year),
+            month,
+            table.c.category_id,
+            func.sum(table.c.amount_paise),
+            func.max(table.c.amount_paise),
+            func.count()
+        ).group_by(table.c.user_id, month, table.c.category_id)
+    ))
+
+def archive_expenses(horizon_years):
+    """
+    Moves expenses dated before archive_cutoff(horizon_years) into their per-year
+    archive tables and rebuilds the summaries of every year touched, one
+    transaction per year. Returns {year: rows moved}.
+    """
+    cutoff = archive_cutoff(horizon_years)
+    expense_year = extract('year', Expense.date)
+    years = sorted(int(y) for (y,) in db.session.query(expense_year)
+                   .filter(Expense.date < cutoff).distinct().all())
+
+    moved = {}
+    for year in years:
+        table = archive_table(year)
+        table.create(db.session.connection(), checkfirst=True)
+
+        hot = Expense.__table__
+        in_year = (hot.c.date >= datetime(year, 1, 1).date()) & (hot.c.date < datetime(year + 1, 1, 1).date())
+        columns = ['expense_id', 'user_id', 'category_id', 'amount_paise', 'date', 'description', 'created_at']
+        result = db.session.execute(table.insert().from_select(columns, select(
+            hot.c.id, hot.c.user_id, hot.c.category_id, hot.c.amount_paise,
+            hot.c.date, hot.c.description, hot.c.created_at
+        ).where(in_year)))
+        db.session.execute(hot.delete().where(in_year))
+        _rebuild_year_summary(year)
+        db.session.commit()
+        moved[year] = result.rowcount
+    return moved
+
+def _dispose_engines_after_fork():
+    """Runs in a forked child so it never reuses pooled connections opened by the parent."""
+    for app in list(_created_apps):
+        with app.app_context():
+            for engine in db.engines.values():
+                engine.dispose(close=False)
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_dispose_engines_after_fork)
+
+# --- Query Helpers ---
+def _expense_table_rows(user_id, start=None, end=None):
+    """Lightweight (id, date, amount_paise, category, description) rows from the hot table, newest first."""
+    query = db.session.query(
+        Expense.id,
+        Expense.date,
+        Expense.amount_paise,
+        Category.name.label('category'),
+        Expense.description
+    ).join(Category, Expense.category_id == Category.id)\
+    .filter(Expense.user_id == user_id)
+    if start:
+        query = query.filter(Expense.date >= start)
+    if end:
+        query = query.filter(Expense.date <= end)
+    return query.order_by(Expense.date.desc()).all()
+
+def _archived_years(user_id):
+    """Years of this user's expenses that have been moved to archive tables, newest first."""
+    return [year for (year,) in db.session.query(ExpenseYearSummary.year)
+            .filter(ExpenseYearSummary.user_id == user_id)
+            .distinct().order_by(ExpenseYearSummary.year.desc()).all()]
+
+def _archived_range(user_id):
+    """(start, end) YYYY-MM-DD strings spanning the user's archived years, for linking to /view; (None, None) if none."""
+    years = _archived_years(user_id)
+    if not years:
+        return None, None
+    return f'{years[-1]}-01-01', f'{years[0]}-12-31'
+
+def _archived_expense_rows(user_id, start=None, end=None):
+    """
+    Archived rows shaped like _expense_table_rows() plus an `archived` flag.
+    Only the archive tables of years overlapping [start, end] are queried.
+    """
+    rows = []
+    for year in _archived_years(user_id):
+        if (start and year < start.year) or (end and year > end.year):
+            continue
+        table = archive_table(year)
+        query = db.session.query(
+            table.c.expense_id.label('id'),
+            table.c.date,
+            table.c.amount_paise,
+            Category.name.label('category'),
+            table.c.description,
+            literal(True).label('archived')
+        ).outerjoin(Category, table.c.category_id == Category.id)\
+        .filter(table.c.user_id == user_id)
+        if start:
+            query = query.filter(table.c.date >= start)
+        if end:
+            query = query.filter(table.c.date <= end)
+        rows.extend(query.order_by(table.c.date.desc()).all())
+    return rows
+
+def _archived_totals(user_id, *criteria):
+    """(total, highest, count) in paise of archived expenses, read from the yearly summaries."""
+    return db.session.query(
+        func.coalesce(func.sum(ExpenseYearSummary.total_paise), 0),
+        func.coalesce(func.max(ExpenseYearSummary.max_paise), 0),
+        func.coalesce(func.sum(ExpenseYearSummary.expense_count), 0)
+    ).filter(ExpenseYearSummary.user_id == user_id, *criteria).one()
+
+def _date_arg(name):
+    """Parses a YYYY-MM-DD query-string argument, ignoring missing or malformed values."""
+    value = request.args.get(name)
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+    except ValueError:
+        return None
+
+def _stream_page(template_name, **context):
+    """
+    Streams a rendered template instead of building the whole page in memory,
+    grouping Jinja's many small chunks so each write carries a useful amount of HTML.
+    """
+    # The session cookie is sent before the body, so pop flashed messages now;
+    # the template's own get_flashed_messages() call reads this request's cached copy
+    get_flashed_messages(with_categories=True)
+    # Called here, inside the request, so the stream captures the request context
+    chunks = stream_template(template_name, **context)
+
+    def grouped():
+        buffer = []
+        for chunk in chunks:
+            buffer.append(chunk)
+            if len(buffer) >= 256:
+                yield ''.join(buffer)
+                buffer.clear()
+        if buffer:
+            yield ''.join(buffer)
+
+    return grouped()
+
+def _sum_expenses_paise(*criteria):
+    """Total of matching expenses in paise, summed by the database."""
+    return db.session.query(func.coalesce(func.sum(Expense.amount_paise), 0)).filter(*criteria).scalar()
+
+def _category_spending(user_id, category_name):
+    """Rows plus total, highest (in paise) and count of expenses for a named system/custom category."""
+    cat_ids = [c.id for c in Category.query.filter(
+        (Category.name == category_name) & 
+        ((Category.user_id == user_id) | (Category.user_id.is_(None)))
+    ).all()]
+    if not cat_ids:
+        return [], 0, 0, 0
+
+    criteria = (Expense.user_id == user_id, Expense.category_id.in_(cat_ids))
+    rows = db.session.query(Expense.date, Expense.amount_paise, Expense.description)\
+        .filter(*criteria).order_by(Expense.date.desc()).all()
+    total, highest, count = db.session.query(
+        func.coalesce(func.sum(Expense.amount_paise), 0),
+        func.coalesce(func.max(Expense.amount_paise), 0),
+        func.count(Expense.id)
+    ).filter(*criteria).one()
+
+    archived_total, archived_highest, archived_count = _archived_totals(user_id, ExpenseYearSummary.category_id.in_(cat_ids))
+    return rows, total + archived_total, max(highest, archived_highest), count + archived_count
+
 # --- Routes ---
 
-@app.route('/')
+@bp.route('/')
 def home():
     if current_user.is_authenticated:
-        return redirect(url_for('dashboard'))
+        return redirect(url_for('.dashboard'))
     return render_template('home.html')
 
-@app.route('/signup', methods=['GET', 'POST'])
+@bp.route('/signup', methods=['GET', 'POST'])
 def signup():
     if current_user.is_authenticated:
-        return redirect(url_for('dashboard'))
+        return redirect(url_for('.dashboard'))
 
     if request.method == 'POST':
         username = request.form.get('username')
@@ -158,7 +538,7 @@ def signup():
             db.session.add(new_user)
             db.session.commit()
             flash('Account created successfully! Please log in.', 'success')
-            return redirect(url_for('login')) 
+            return redirect(url_for('.login')) 
 
         except Exception as e:
             db.session.rollback()
@@ -167,10 +547,10 @@ def signup():
 
     return render_template('signup.html')
 
-@app.route('/login', methods=['GET', 'POST'])
+@bp.route('/login', methods=['GET', 'POST'])
 def login():
     if current_user.is_authenticated:
-        return redirect(url_for('dashboard'))
+        return redirect(url_for('.dashboard'))
 
     if request.method == 'POST':
         login_id = request.form.get('login_id')
@@ -181,20 +561,20 @@ def login():
         if user and user.check_password(password):
             login_user(user)
             flash(f'Welcome back, {user.username}!', 'success')
-            return redirect(url_for('dashboard'))
+            return redirect(url_for('.dashboard'))
         else:
             flash('Invalid username/email or password.', 'danger')
 
     return render_template('login.html')
 
-@app.route('/logout')
+@bp.route('/logout')
 @login_required
 def logout():
     logout_user()
     flash('You have been logged out.', 'success')
-    return redirect(url_for('home'))
+    return redirect(url_for('.home'))
 
-@app.route('/add', methods=['GET', 'POST'])
+@bp.route('/add', methods=['GET', 'POST'])
 @login_required
 def add():
     # 1. Fetch all categories available to the user (System default + User custom)
@@ -244,30 +624,30 @@ def add():
             category_id = request.form.get('category')
             description = request.form.get('description')
 
-            if not all([amount, date_str, category_id]) or float(amount) <= 0:
+            if not all([amount, date_str, category_id]) or to_paise(amount) <= 0:
                 flash('Invalid data.', 'danger')
-                return redirect(url_for('add'))
+                return redirect(url_for('.add'))
                 
             selected_cat = Category.query.get(int(category_id))
             if selected_cat and selected_cat.name in categories_to_exclude:
                  flash(f'Cannot add expenses to the excluded "{selected_cat.name}" category.', 'danger')
-                 return redirect(url_for('add'))
+                 return redirect(url_for('.add'))
 
 
             expense_date = datetime.strptime(date_str, '%Y-%m-%d').date()
-            new_expense = Expense(user_id=current_user.id, amount=float(amount), date=expense_date, category_id=int(category_id), description=description)
+            new_expense = Expense(user_id=current_user.id, amount_paise=to_paise(amount), date=expense_date, category_id=int(category_id), description=description)
             
             db.session.add(new_expense)
             db.session.commit()
             flash('Expense added successfully!', 'success')
-            return redirect(url_for('dashboard')) 
+            return redirect(url_for('.dashboard')) 
         except Exception as e:
             db.session.rollback()
             flash(f'Error: {e}', 'danger')
 
     return render_template('add.html', categories=categories, preselected_id=preselected_id, today=datetime.now().strftime('%Y-%m-%d'))
 
-@app.route('/add_bill', methods=['POST'])
+@bp.route('/add_bill', methods=['POST'])
 @login_required
 def add_bill():
     try:
@@ -278,11 +658,11 @@ def add_bill():
 
         if not all([amount, due_date_str, category_id]):
             flash('Missing required fields.', 'danger')
-            return redirect(url_for('bill'))
+            return redirect(url_for('.bill'))
 
         new_bill = Bill(
             user_id=current_user.id,
-            amount=float(amount),
+            amount_paise=to_paise(amount),
             due_date=datetime.strptime(due_date_str, '%Y-%m-%d').date(),
             category_id=int(category_id),
             description=description,
@@ -295,36 +675,36 @@ def add_bill():
         db.session.rollback()
         flash(f'Error adding bill: {e}', 'danger')
 
-    return redirect(url_for('bill'))
+    return redirect(url_for('.bill'))
     
 # --- BILL MANAGEMENT ROUTES (UNCHANGED) ---
 
-@app.route('/complete_bill/<int:bill_id>', methods=['POST'])
+@bp.route('/complete_bill/<int:bill_id>', methods=['POST'])
 @login_required
 def complete_bill(bill_id):
     """Marks a bill reminder as paid (completed)."""
     bill_to_complete = Bill.query.get_or_404(bill_id)
     if bill_to_complete.user_id != current_user.id:
         flash('You do not have permission to mark this bill.', 'danger')
-        return redirect(url_for('bill'))
+        return redirect(url_for('.bill'))
     try:
         bill_to_complete.is_paid = True
         cat_name = Category.query.get(bill_to_complete.category_id).name if bill_to_complete.category_id else 'Bill'
-        flash(f'{cat_name} bill for ₹{float(bill_to_complete.amount)} marked as paid! Don\'t forget to add it as a new expense for accurate tracking.', 'success')
+        flash(f'{cat_name} bill for ₹{format_rupees(bill_to_complete.amount_paise)} marked as paid! Don\'t forget to add it as a new expense for accurate tracking.', 'success')
         db.session.commit()
     except Exception as e:
         db.session.rollback()
         flash(f'Error marking bill as paid: {e}', 'danger')
-    return redirect(url_for('bill'))
+    return redirect(url_for('.bill'))
 
-@app.route('/delete_bill/<int:bill_id>', methods=['POST'])
+@bp.route('/delete_bill/<int:bill_id>', methods=['POST'])
 @login_required
 def delete_bill(bill_id):
     """Deletes a bill reminder."""
     bill_to_delete = Bill.query.get_or_404(bill_id)
     if bill_to_delete.user_id != current_user.id:
         flash('You do not have permission to delete this bill.', 'danger')
-        return redirect(url_for('bill'))
+        return redirect(url_for('.bill'))
     try:
         db.session.delete(bill_to_delete)
         db.session.commit()
@@ -332,70 +712,58 @@ def delete_bill(bill_id):
     except Exception as e:
         db.session.rollback()
         flash(f'Error deleting bill reminder: {e}', 'danger')
-    return redirect(url_for('bill'))
+    return redirect(url_for('.bill'))
 
 # --- DASHBOARD (UNCHANGED) ---
-@app.route('/dashboard')
+@bp.route('/dashboard')
 @login_required
 def dashboard():
     """Renders the dashboard page containing charts and the detailed expense table."""
-    expenses_data = db.session.query(Expense, Category.name.label('category_name'))\
-        .join(Category, Expense.category_id == Category.id)\
-        .filter(Expense.user_id == current_user.id).order_by(Expense.date.desc()).all()
-
-    expenses_list = []
-    total_expenses = 0.0
-    
-    total_savings_amount = 0.0
-        
-    for exp, cat_name in expenses_data:
-        expenses_list.append({
-            'id': exp.id,
-            'date': exp.date.strftime('%Y-%m-%d'),
-            'amount': float(exp.amount),
-            'category': cat_name,
-            'description': exp.description
-        })
-        total_expenses += float(exp.amount)
+    expenses_list = _expense_table_rows(current_user.id)
+    total_expenses = _sum_expenses_paise(Expense.user_id == current_user.id) + _archived_totals(current_user.id)[0]
         
-    return render_template('dashboard.html', 
+    return _stream_page('dashboard.html', 
                            expenses=expenses_list, 
                            total_expenses=total_expenses, 
                            username=current_user.username)
 
 
 # --- ROUTE: View Expenses (Table Only) (UNCHANGED) ---
-@app.route('/view')
+@bp.route('/view')
 @login_required
 def view():
-    """Renders the detailed expense table page (no charts)."""
-    expenses_data = db.session.query(Expense, Category.name.label('category_name'))\
-        .join(Category, Expense.category_id == Category.id)\
-        .filter(Expense.user_id == current_user.id).order_by(Expense.date.desc()).all()
-
-    expenses_list = []
-    total_expenses = 0.0
-    
-    for exp, cat_name in expenses_data:
-        expenses_list.append({
-            'id': exp.id,
-            'date': exp.date.strftime('%Y-%m-%d'),
-            'amount': float(exp.amount),
-            'category': cat_name,
-            'description': exp.description
-        })
-        total_expenses += float(exp.amount)
+    """
+    Renders the detailed expense table page (no charts). Archived expenses are
+    only listed when a start/end date range reaching an archived year is given.
+    """
+    start, end = _date_arg('start'), _date_arg('end')
+    expenses_list = _expense_table_rows(current_user.id, start, end)
+
+    if start or end:
+        archived = _archived_expense_rows(current_user.id, start, end)
+        criteria = [Expense.user_id == current_user.id]
+        if start:
+            criteria.append(Expense.date >= start)
+        if end:
+            criteria.append(Expense.date <= end)
+        total_expenses = _sum_expenses_paise(*criteria) + sum(row.amount_paise for row in archived)
+        expenses_list += archived
+        # Backdated hot rows can be older than archived ones until the next archive run
+        expenses_list.sort(key=lambda exp: exp.date, reverse=True)
+    else:
+        total_expenses = _sum_expenses_paise(Expense.user_id == current_user.id) + _archived_totals(current_user.id)[0]
         
-    return render_template('view.html', expenses=expenses_list, total_expenses=total_expenses, username=current_user.username)
+    return _stream_page('view.html', expenses=expenses_list, total_expenses=total_expenses, username=current_user.username,
+                        start=start, end=end)
 
-@app.route('/delete_expense/<int:expense_id>', methods=['POST'])
+@bp.route('/delete_expense/<int:expense_id>', methods=['POST'])
 @login_required
 def delete_expense(expense_id):
     expense_to_delete = Expense.query.get_or_404(expense_id)
 
     if expense_to_delete.user_id != current_user.id:
         flash('You do not have permission to delete this expense.', 'danger')
-        return redirect(url_for('dashboard'))
+        return redirect(url_for('.dashboard'))
     
     try:
         db.session.delete(expense_to_delete)
@@ -405,19 +773,19 @@ def delete_expense(expense_id):
         db.session.rollback()
         flash(f'Error deleting expense: {e}', 'danger')
 
-    return redirect(request.referrer or url_for('dashboard'))
+    return redirect(request.referrer or url_for('.dashboard'))
 
 # --- DISABLED ROUTE (UNCHANGED) ---
-@app.route('/savings_details')
+@bp.route('/savings_details')
 @login_required
 def savings_details():
     """Renders the Savings page using the dedicated 'Savings' category."""
     flash("This feature has been temporarily disabled.", 'info')
-    return redirect(url_for('dashboard'))
+    return redirect(url_for('.dashboard'))
 
 
 # --- NEW ROUTE: Loan Plan Input Form (Replaces /set_financial_plan) ---
-@app.route('/set_loan_plan', methods=['GET', 'POST'])
+@bp.route('/set_loan_plan', methods=['GET', 'POST'])
 @login_required
 def set_loan_plan():
     plan = FinancialPlan.query.filter_by(user_id=current_user.id).first()
@@ -432,7 +800,7 @@ def set_loan_plan():
             
             if principal < 0 or rate < 0 or tenure <= 0 or income < 0:
                 flash('Invalid input values. Principal, Rate, and Tenure must be positive.', 'danger')
-                return redirect(url_for('set_loan_plan'))
+                return redirect(url_for('.set_loan_plan'))
             
             if plan:
                 plan.loan_principal = principal
@@ -452,7 +820,7 @@ def set_loan_plan():
                 flash('Loan plan saved successfully! View your debt details.', 'success')
             
             db.session.commit()
-            return redirect(url_for('debt_details'))
+            return redirect(url_for('.debt_details'))
 
         except Exception as e:
             db.session.rollback()
@@ -463,7 +831,7 @@ def set_loan_plan():
 
 
 # --- MODIFIED ROUTE: Debt Details (Replaces /savings_debt_details) ---
-@app.route('/debt_details')
+@bp.route('/debt_details')
 @login_required
 def debt_details():
     """Renders the Debt & EMI Tracker page, calculating EMI from saved plan."""
@@ -473,7 +841,7 @@ def debt_details():
     # Redirect to plan setup if no plan exists
     if not plan or float(plan.loan_principal) <= 0:
         flash('Please set your loan details first to use the Debt Tracker.', 'info')
-        return redirect(url_for('set_loan_plan'))
+        return redirect(url_for('.set_loan_plan'))
         
     P = float(plan.loan_principal)
     annualRate = float(plan.annual_interest_rate)
@@ -500,30 +868,23 @@ def debt_details():
     # 1. Fetch debt payment history (from 'Savings & Debt' category)
     debt_cat = Category.query.filter_by(name='Savings & Debt').first()
     
-    total_debt_payments_made = 0.0
+    total_debt_payments_made = 0
+    debt_payment_count = 0
     debt_transactions = []
     
     if debt_cat:
-        all_transactions = Expense.query.filter(
-            Expense.user_id == current_user.id, 
-            Expense.category_id == debt_cat.id
-        ).order_by(Expense.date.desc()).all()
-        
-        for exp in all_transactions:
-            item = {
-                'id': exp.id,
-                'date': exp.date.strftime('%Y-%m-%d'),
-                'amount': float(exp.amount),
-                'description': exp.description,
-                'category_id': exp.category_id
-            }
-            debt_transactions.append(item)
-            total_debt_payments_made += item['amount']
+        criteria = (Expense.user_id == current_user.id, Expense.category_id == debt_cat.id)
+        debt_transactions = db.session.query(
+            Expense.id, Expense.date, Expense.amount_paise, Expense.description, Expense.category_id
+        ).filter(*criteria).order_by(Expense.date.desc()).all()
+        archived_total, _, archived_count = _archived_totals(current_user.id, ExpenseYearSummary.category_id == debt_cat.id)
+        total_debt_payments_made = _sum_expenses_paise(*criteria) + archived_total
+        debt_payment_count = len(debt_transactions) + archived_count
             
-    # Calculate Remaining Principal (Simplified: Principal - Total Payments)
-    remaining_principal = P - total_debt_payments_made
+    # Calculate Remaining Principal in paise (Simplified: Principal - Total Payments)
+    remaining_principal = to_paise(plan.loan_principal) - total_debt_payments_made
     if remaining_principal < 0:
-        remaining_principal = 0.0 # Avoid negative remaining principal
+        remaining_principal = 0 # Avoid negative remaining principal
 
     # Data to pass to the template
     context = {
@@ -534,6 +895,7 @@ def debt_details():
         'remaining_principal': remaining_principal,
         'total_debt_payments_made': total_debt_payments_made,
         'debt_transactions': debt_transactions,
+        'debt_payment_count': debt_payment_count,
         'username': current_user.username
     }
     
@@ -542,189 +904,208 @@ def debt_details():
 
 # --- ALL OTHER CATEGORY ROUTES (UNCHANGED) ---
 
-@app.route('/shopping_details')
+@bp.route('/shopping_details')
 @login_required
 def shopping():
-    shopping_categories = Category.query.filter(
-        (Category.name == 'Shopping') & 
-        ((Category.user_id == current_user.id) | (Category.user_id.is_(None)))
-    ).all()
-    
-    cat_ids = [c.id for c in shopping_categories]
-    expenses_list = []
-    total_shopping = 0.0
-    highest_shopping = 0.0
-
-    if cat_ids:
-        data = Expense.query.filter(Expense.user_id == current_user.id, Expense.category_id.in_(cat_ids)).order_by(Expense.date.desc()).all()
-        for e in data:
-            expenses_list.append({'date': e.date, 'amount': float(e.amount), 'description': e.description})
-        
-        total_shopping = sum(e['amount'] for e in expenses_list)
-        if expenses_list: highest_shopping = max(e['amount'] for e in expenses_list)
+    expenses_list, total_shopping, highest_shopping, count_shopping = _category_spending(current_user.id, 'Shopping')
+    archived_start, archived_end = _archived_range(current_user.id)
 
     return render_template('shopping.html', shopping_expenses=expenses_list, 
-                           total_shopping_spending=total_shopping, highest_shopping_expense=highest_shopping)
+                           total_shopping_spending=total_shopping, highest_shopping_expense=highest_shopping,
+                           shopping_expense_count=count_shopping,
+                           archived_start=archived_start, archived_end=archived_end)
 
-@app.route('/food_spending')
+@bp.route('/food_spending')
 @login_required
 def food():
-    food_categories = Category.query.filter(
-        (Category.name == 'Food') & 
-        ((Category.user_id == current_user.id) | (Category.user_id.is_(None)))
-    ).all()
-    
-    cat_ids = [c.id for c in food_categories]
-    expenses_list = []
-    total_food = 0.0
-    highest_food = 0.0
-
-    if cat_ids:
-        data = Expense.query.filter(Expense.user_id == current_user.id, Expense.category_id.in_(cat_ids)).order_by(Expense.date.desc()).all()
-        for e in data:
-            expenses_list.append({'date': e.date, 'amount': float(e.amount), 'description': e.description})
-            
-        total_food = sum(e['amount'] for e in expenses_list)
-        if expenses_list: highest_food = max(e['amount'] for e in expenses_list)
+    expenses_list, total_food, highest_food, count_food = _category_spending(current_user.id, 'Food')
+    archived_start, archived_end = _archived_range(current_user.id)
 
     return render_template('food.html', food_expenses=expenses_list, 
-                           total_food_spending=total_food, highest_food_expense=highest_food)
+                           total_food_spending=total_food, highest_food_expense=highest_food,
+                           food_expense_count=count_food,
+                           archived_start=archived_start, archived_end=archived_end)
 
-@app.route('/healthcare_details')
+@bp.route('/healthcare_details')
 @login_required
 def healthcare():
-    healthcare_categories = Category.query.filter(
-        (Category.name == 'Healthcare') & 
-        ((Category.user_id == current_user.id) | (Category.user_id.is_(None)))
-    ).all()
-    
-    cat_ids = [c.id for c in healthcare_categories]
-    expenses_list = []
-    total_healthcare = 0.0
-    highest_healthcare = 0.0
-
-    if cat_ids:
-        data = Expense.query.filter(Expense.user_id == current_user.id, Expense.category_id.in_(cat_ids)).order_by(Expense.date.desc()).all()
-        for e in data:
-            expenses_list.append({'date': e.date, 'amount': float(e.amount), 'description': e.description})
-        
-        total_healthcare = sum(e['amount'] for e in expenses_list)
-        if expenses_list: highest_healthcare = max(e['amount'] for e in expenses_list)
+    expenses_list, total_healthcare, highest_healthcare, count_healthcare = _category_spending(current_user.id, 'Healthcare')
+    archived_start, archived_end = _archived_range(current_user.id)
 
     return render_template('healthcare.html', healthcare_expenses=expenses_list, 
-                           total_healthcare_spending=total_healthcare, highest_healthcare_expense=highest_healthcare)
+                           total_healthcare_spending=total_healthcare, highest_healthcare_expense=highest_healthcare,
+                           healthcare_expense_count=count_healthcare,
+                           archived_start=archived_start, archived_end=archived_end)
 
 
-@app.route('/bill_details')
+# Paid bills listed per section; totals still cover the full history
+BILL_RECENT_ROWS = 10
+
+@bp.route('/bill_details')
 @login_required
 def bill():
-    BILL_CATEGORY_MAP = {
-        'House Rent & Mortgage': ['Rent/Mortgage'],
-        'Electricity Bill':      ['Electricity'], 
-        'Water & Gas Bill':      ['Water/Gas'],
-        'Internet & Phone':      ['Internet/Phone'] 
-    }
-
-    all_names = [n for sub in BILL_CATEGORY_MAP.values() for n in sub]
-    bill_cats = Category.query.filter(Category.name.in_(all_names)).all()
-    
-    cat_name_to_id = {c.name: c.id for c in bill_cats}
-    cat_id_to_name = {c.id: c.name for c in bill_cats}
-    bill_cat_ids = list(cat_id_to_name.keys())
-
-    category_breakdown = {k: {'total': 0.0, 'expenses': [], 'reminders': [], 'target_id': ''} for k in BILL_CATEGORY_MAP.keys()}
-
-    for section_name, db_names in BILL_CATEGORY_MAP.items():
-        primary_name = db_names[0]
-        if primary_name in cat_name_to_id:
-            category_breakdown[section_name]['target_id'] = cat_name_to_id[primary_name]
-
-    expenses_list = []
-    if bill_cat_ids:
-        paid_data = Expense.query.filter(Expense.user_id == current_user.id, Expense.category_id.in_(bill_cat_ids)).order_by(Expense.date.desc()).all()
-        for exp in paid_data:
-            cat_name = cat_id_to_name.get(exp.category_id)
-            item = {'date': exp.date, 'amount': float(exp.amount), 'description': exp.description}
-            
-            for disp, db_names in BILL_CATEGORY_MAP.items():
-                if cat_name in db_names:
-                    category_breakdown[disp]['expenses'].append(item)
-                    category_breakdown[disp]['total'] += float(exp.amount)
-                    expenses_list.append(item)
-                    break
-    
-    total_bill = sum(e['amount'] for e in expenses_list)
-    highest_bill = max([e['amount'] for e in expenses_list]) if expenses_list else 0
-
-    unpaid = Bill.query.filter_by(user_id=current_user.id, is_paid=False).all()
+    # 1. Sections in display order, with the system category that new reminders are filed under
+    section_rows = db.session.query(BillSection.section, Category.id)\
+        .outerjoin(Category, (Category.name == BillSection.category_name) & Category.user_id.is_(None))\
+        .order_by(BillSection.position, BillSection.id).all()
+
+    category_breakdown = {}
+    for section, cat_id in section_rows:
+        if section not in category_breakdown:
+            category_breakdown[section] = {'total': 0, 'highest': 0, 'count': 0, 'expenses': [], 'reminders': [],
+                                           'target_id': cat_id or ''}
+
+    def paid_bill_query(*columns):
+        return db.session.query(*columns).select_from(Expense)\
+            .join(Category, Expense.category_id == Category.id)\
+            .join(BillSection, BillSection.category_name == Category.name)\
+            .filter(Expense.user_id == current_user.id)
+
+    # 2. Per-section totals, highest payment and count
+    section_totals = paid_bill_query(
+        BillSection.section,
+        func.sum(Expense.amount_paise),
+        func.max(Expense.amount_paise),
+        func.count(Expense.id)
+    ).group_by(BillSection.section).all()
+
+    for section, total, highest, count in section_totals:
+        category_breakdown[section].update(total=total, highest=highest, count=count)
+
+    # Archived years contribute through their summaries
+    archived_section_totals = db.session.query(
+        BillSection.section,
+        func.sum(ExpenseYearSummary.total_paise),
+        func.max(ExpenseYearSummary.max_paise),
+        func.sum(ExpenseYearSummary.expense_count)
+    ).select_from(ExpenseYearSummary)\
+    .join(Category, ExpenseYearSummary.category_id == Category.id)\
+    .join(BillSection, BillSection.category_name == Category.name)\
+    .filter(ExpenseYearSummary.user_id == current_user.id)\
+    .group_by(BillSection.section).all()
+
+    for section, total, highest, count in archived_section_totals:
+        data = category_breakdown[section]
+        data.update(total=data['total'] + total, highest=max(data['highest'], highest), count=data['count'] + count)
+
+    # 3. Most recent payments per section
+    row_number = func.row_number().over(
+        partition_by=BillSection.section,
+        order_by=(Expense.date.desc(), Expense.id.desc())
+    ).label('row_number')
+    ranked = paid_bill_query(
+        BillSection.section.label('section'),
+        Expense.date,
+        Expense.amount_paise,
+        Expense.description,
+        row_number
+    ).subquery()
+    recent = db.session.query(ranked.c.section, ranked.c.date, ranked.c.amount_paise, ranked.c.description)\
+        .filter(ranked.c.row_number <= BILL_RECENT_ROWS)\
+        .order_by(ranked.c.section, ranked.c.row_number).all()
+
+    for exp in recent:
+        category_breakdown[exp.section]['expenses'].append(exp)
+
+    total_bill = sum(data['total'] for data in category_breakdown.values())
+    highest_bill = max((data['highest'] for data in category_breakdown.values()), default=0)
+    payment_count = sum(data['count'] for data in category_breakdown.values())
+
+    # 4. Unpaid reminders, read in due-date order from ix_bills_user_unpaid_due
+    unpaid = db.session.query(Bill, Category.name, BillSection.section)\
+        .outerjoin(Category, Bill.category_id == Category.id)\
+        .outerjoin(BillSection, BillSection.category_name == Category.name)\
+        .filter(Bill.user_id == current_user.id, Bill.is_paid.is_(False))\
+        .order_by(Bill.due_date).all()
     today = datetime.now().date()
     
-    for b in unpaid:
+    for b, cat_name, section in unpaid:
         days_left = (b.due_date - today).days
-        c_name = cat_id_to_name.get(b.category_id, 'Bill')
-        for disp, db_names in BILL_CATEGORY_MAP.items():
-            if c_name in db_names:
-                category_breakdown[disp]['reminders'].append({
-                    'id': b.id,
-                    'amount': float(b.amount), 
-                    'due_date': b.due_date, 
-                    'days_left': days_left, 
-                    'description': b.description
-                })
+        c_name = cat_name if section else 'Bill'
+        if section:
+            category_breakdown[section]['reminders'].append({
+                'id': b.id,
+                'amount_paise': b.amount_paise, 
+                'due_date': b.due_date, 
+                'days_left': days_left, 
+                'description': b.description
+            })
 
         if 0 <= days_left <= 5:
-            flash(f'Reminder: {c_name} of ₹{b.amount} is due in {days_left} days!', 'warning')
+            flash(f'Reminder: {c_name} of ₹{format_rupees(b.amount_paise)} is due in {days_left} days!', 'warning')
         elif days_left < 0:
-            flash(f'Overdue: {c_name} of ₹{b.amount} was due on {b.due_date}!', 'danger')
+            flash(f'Overdue: {c_name} of ₹{format_rupees(b.amount_paise)} was due on {b.due_date}!', 'danger')
 
     return render_template('bill.html', total_bill_spending=total_bill, highest_bill_expense=highest_bill,
-                           bill_expenses=expenses_list, category_breakdown=category_breakdown)
+                           bill_payment_count=payment_count, category_breakdown=category_breakdown)
 
 
 # --- Plotly Data API Endpoint (UNCHANGED) ---
 
-@app.route('/api/expense_data', methods=['GET'])
+@bp.route('/api/expense_data', methods=['GET'])
 @login_required
 def api_expense_data():
     """
     Returns expense data structured for Plotly visualization, including 
     Category and Amount for all expenses, and Monthly Totals.
+    Individual expenses come from the hot table; archived ones are added only
+    for an optional ?start=YYYY-MM-DD&end=YYYY-MM-DD range. Totals always
+    cover the full history via the yearly summaries.
     """
+    start, end = _date_arg('start'), _date_arg('end')
     
     # 1. Individual Expenses (for scatter/line plot of all spending over time)
-    expenses_data = db.session.query(
-        Expense.date, 
-        Expense.amount, 
-        Category.name.label('category_name')
-    ).join(Category, Expense.category_id == Category.id)\
-    .filter(Expense.user_id == current_user.id)\
-    .order_by(Expense.date.asc()).all()
+    expenses_data = _expense_table_rows(current_user.id, start, end)
+    if start or end:
+        expenses_data += _archived_expense_rows(current_user.id, start, end)
+    expenses_data.sort(key=lambda exp: exp.date)
     
     # Format data: Plotly likes separate arrays for X, Y, and a category
     all_dates = [exp.date.strftime('%Y-%m-%d') for exp in expenses_data]
-    all_amounts = [float(exp.amount) for exp in expenses_data]
-    all_categories = [exp.category_name for exp in expenses_data]
+    all_amounts = [paise_to_rupees(exp.amount_paise) for exp in expenses_data]
+    all_categories = [exp.category for exp in expenses_data]
     
     # 2. Monthly Totals (for bar chart visualization)
     month_totals_query = db.session.query(
         func.strftime('%Y-%m', Expense.date), 
-        func.sum(Expense.amount)
+        func.sum(Expense.amount_paise)
     ).filter(Expense.user_id == current_user.id)\
     .group_by(func.strftime('%Y-%m', Expense.date))\
     .order_by(func.strftime('%Y-%m', Expense.date).asc()).all()
     
-    monthly_x = [m for m, t in month_totals_query]
-    monthly_y = [float(t) for m, t in month_totals_query]
+    month_totals = dict(month_totals_query)
+    archived_months = db.session.query(
+        ExpenseYearSummary.year,
+        ExpenseYearSummary.month,
+        func.sum(ExpenseYearSummary.total_paise)
+    ).filter(ExpenseYearSummary.user_id == current_user.id)\
+    .group_by(ExpenseYearSummary.year, ExpenseYearSummary.month).all()
+    for year, month, total in archived_months:
+        key = f'{year}-{month:02d}'
+        month_totals[key] = month_totals.get(key, 0) + total
+    
+    monthly_x = sorted(month_totals)
+    monthly_y = [paise_to_rupees(month_totals[m]) for m in monthly_x]
 
     # 3. Category Breakdown (for pie chart visualization)
     category_totals_query = db.session.query(
         Category.name, 
-        func.sum(Expense.amount)
+        func.sum(Expense.amount_paise)
     ).join(Expense).filter(Expense.user_id == current_user.id)\
     .group_by(Category.name).all()
     
-    category_labels = [n for n, t in category_totals_query]
-    category_values = [float(t) for n, t in category_totals_query]
+    category_totals = dict(category_totals_query)
+    archived_categories = db.session.query(
+        Category.name,
+        func.sum(ExpenseYearSummary.total_paise)
+    ).join(ExpenseYearSummary, ExpenseYearSummary.category_id == Category.id)\
+    .filter(ExpenseYearSummary.user_id == current_user.id)\
+    .group_by(Category.name).all()
+    for name, total in archived_categories:
+        category_totals[name] = category_totals.get(name, 0) + total
+    
+    category_labels = list(category_totals)
+    category_values = [paise_to_rupees(t) for t in category_totals.values()]
 
     return jsonify({
         'all_expenses': {
@@ -742,6 +1123,69 @@ def api_expense_data():
         }
     })
 
+# --- App Factory ---
+def create_app(config_name=None, test_config=None):
+    """
+    Builds and configures the Flask app. Nothing touches the database here:
+    the engine opens its first connection on the first query, so pre-forking
+    servers should load the app with `gunicorn "app:create_app()"`.
+    `test_config` overrides individual settings (e.g. the database URI).
+    """
+    config_name = config_name or os.environ.get('APP_CONFIG', 'development')
+    config_class = config_by_name[config_name]
+
+    app = Flask(__name__)
+    app.config.from_object(config_class)
+    if test_config:
+        app.config.update(test_config)
+    if not app.config.get('SECRET_KEY'):
+        raise RuntimeError('SECRET_KEY must be set for the %s config.' % config_name)
+
+    db.init_app(app)
+    login_manager.init_app(app)
+    app.register_blueprint(bp)
+
+    # Checked on the first request rather than here, so creating the app stays free of DB work
+    schema_checked = []
+
+    @app.before_request
+    def require_migrated_schema():
+        """Fails fast with instructions instead of erroring on every query against an old schema."""
+        if schema_checked:
+            return
+        problem = pending_migration()
+        if problem:
+            raise RuntimeError(
+                f'The database needs migrating ({problem}). '
+                'Run `flask --app app init-db` before starting workers.'
+            )
+        schema_checked.append(True)
+
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Creates tables, migrates older databases and seeds the default categories."""
+        init_db(app)
+
+    @app.cli.command('archive-expenses')
+    @click.option('--horizon-years', type=click.IntRange(min=1), default=None,
+                  help='Years kept in the hot table, including the current one (default: ARCHIVE_HORIZON_YEARS).')
+    def archive_expenses_command(horizon_years):
+        """Moves expenses older than the horizon into yearly archive tables."""
+        if horizon_years is None:
+            horizon_years = app.config['ARCHIVE_HORIZON_YEARS']
+        try:
+            moved = archive_expenses(horizon_years)
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint='ARCHIVE_HORIZON_YEARS')
+        for year, count in moved.items():
+            print(f"Archived {count} expenses from {year}.")
+        if not moved:
+            print("Nothing to archive.")
+
+    _created_apps.add(app)
+    return app
+
 if __name__ == '__main__':
-    init_db()
-    app.run(port=5001, debug=True)
\ No newline at end of file
+    app = create_app()
+    init_db(app)
+    app.run(port=5001, debug=app.config['DEBUG'])
\ No newline at end of file
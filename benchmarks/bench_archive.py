@@ -0,0 +1,52 @@
+"""
+Benchmark for tiered storage: spreads N expenses over ten years, times the
+large-list routes, archives everything older than the horizon, and times them
+again.
+
+Usage: python benchmarks/bench_archive.py [expenses] [runs] [horizon_years]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from jinja2 import FileSystemLoader
+
+from bench_large_lists import ROOT, ROUTES, m, measure, seed
+
+def report(client, runs):
+    print(f"  {'route':<20} {'time (ms)':>10} {'peak alloc (KiB)':>18}")
+    for path in ROUTES:
+        seconds, peak = measure(client, path, runs)
+        print(f"  {path:<20} {seconds * 1000:10.1f} {peak / 1024:18.0f}")
+
+def main():
+    n_expenses = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    horizon_years = int(sys.argv[3]) if len(sys.argv) > 3 else 2
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = m.create_app('testing', {
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(tmp, 'bench.db'),
+        })
+        # Templates sit at the repository root in this checkout
+        app.jinja_loader = FileSystemLoader(ROOT)
+        seed(app, n_expenses, years=10)
+
+        client = app.test_client()
+        client.post('/login', data={'login_id': 'bench', 'password': 'bench'})
+
+        print(f"{n_expenses} expenses over 10 years, median of {runs} requests")
+        print("All expenses in the hot table:")
+        report(client, runs)
+
+        with app.app_context():
+            t0 = time.perf_counter()
+            moved = m.archive_expenses(horizon_years)
+            elapsed = time.perf_counter() - t0
+        print(f"Archived {sum(moved.values())} expenses from {len(moved)} years in {elapsed * 1000:.0f} ms "
+              f"(horizon: {horizon_years} years):")
+        report(client, runs)
+
+if __name__ == '__main__':
+    main()
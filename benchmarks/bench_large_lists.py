@@ -0,0 +1,94 @@
+"""
+CPU and memory benchmark for the large-list routes.
+
+Seeds one user with N expenses in a throwaway SQLite file, then requests each
+route through the test client and reports the median wall time and the peak
+Python allocation (tracemalloc) of one request.
+
+Usage: python benchmarks/bench_large_lists.py [expenses] [runs]
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from jinja2 import FileSystemLoader
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import app as m
+
+ROUTES = ['/dashboard', '/view', '/food_spending', '/bill_details', '/api/expense_data']
+
+def seed(app, n_expenses, years=3):
+    rng = random.Random(42)
+    with app.app_context():
+        m.init_db(app)
+        user = m.User(username='bench', email='bench@example.com')
+        user.set_password('bench')
+        m.db.session.add(user)
+        m.db.session.commit()
+
+        cat_ids = [c.id for c in m.Category.query.filter(m.Category.user_id.is_(None)).all()]
+        start = date.today() - timedelta(days=365 * years)
+        rows = [{
+            'user_id': user.id,
+            'category_id': rng.choice(cat_ids),
+            'amount_paise': rng.randint(100, 500000),
+            'date': start + timedelta(days=rng.randint(0, 365 * years)),
+            'description': f'expense {i}',
+        } for i in range(n_expenses)]
+        m.db.session.execute(m.Expense.__table__.insert(), rows)
+        m.db.session.commit()
+
+def fetch(client, path):
+    """Requests `path` and consumes the body chunk by chunk, as a server writing to a socket would."""
+    resp = client.get(path)
+    for _ in resp.iter_encoded():
+        pass
+    resp.close()
+    return resp
+
+def measure(client, path, runs):
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        resp = fetch(client, path)
+        times.append(time.perf_counter() - t0)
+        assert resp.status_code == 200, (path, resp.status_code)
+
+    # Traced separately: tracemalloc slows the request down considerably
+    tracemalloc.start()
+    fetch(client, path)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return statistics.median(times), peak
+
+def main():
+    n_expenses = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = m.create_app('testing', {
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(tmp, 'bench.db'),
+        })
+        # Templates sit at the repository root in this checkout
+        app.jinja_loader = FileSystemLoader(ROOT)
+        seed(app, n_expenses)
+
+        client = app.test_client()
+        client.post('/login', data={'login_id': 'bench', 'password': 'bench'})
+
+        print(f"{n_expenses} expenses, median of {runs} requests")
+        print(f"  {'route':<20} {'time (ms)':>10} {'peak alloc (KiB)':>18}")
+        for path in ROUTES:
+            seconds, peak = measure(client, path, runs)
+            print(f"  {path:<20} {seconds * 1000:10.1f} {peak / 1024:18.0f}")
+
+if __name__ == '__main__':
+    main()
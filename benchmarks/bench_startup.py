@@ -0,0 +1,68 @@
+"""
+Startup-time benchmark for the app factory.
+
+Each run happens in a fresh interpreter (like a new worker process) against a
+throwaway SQLite file and reports:
+  - import:       importing app.py (no app, engine or DB work at import time)
+  - create_app:   building and configuring one app instance
+  - first query:  the lazily created engine opening its first connection
+  - init_db cold: creating tables and seeding an empty database
+  - init_db warm: re-running the seed on an already seeded database
+
+Usage: python benchmarks/bench_startup.py [runs]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r'''
+import json, time
+t0 = time.perf_counter()
+import app as m
+t1 = time.perf_counter()
+a = m.create_app('production')
+t2 = time.perf_counter()
+with a.app_context():
+    m.db.session.execute(m.db.text('SELECT 1'))
+t3 = time.perf_counter()
+m.init_db(a)
+t4 = time.perf_counter()
+m.init_db(a)
+t5 = time.perf_counter()
+print(json.dumps({
+    'import': t1 - t0,
+    'create_app': t2 - t1,
+    'first query': t3 - t2,
+    'init_db cold': t4 - t3,
+    'init_db warm': t5 - t4,
+}))
+'''
+
+def run_once():
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ)
+        env['DATABASE_URL'] = 'sqlite:///' + os.path.join(tmp, 'bench.db')
+        env['SECRET_KEY'] = 'bench'
+        out = subprocess.run(
+            [sys.executable, '-c', CHILD], cwd=ROOT, env=env,
+            check=True, capture_output=True, text=True
+        ).stdout
+        # init_db prints a status line; the timings are the last line
+        return json.loads(out.strip().splitlines()[-1])
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    results = [run_once() for _ in range(runs)]
+
+    print(f"Startup timings over {runs} fresh processes (median, ms)")
+    for key in results[0]:
+        median_ms = statistics.median(r[key] for r in results) * 1000
+        print(f"  {key:<14} {median_ms:8.2f}")
+
+if __name__ == '__main__':
+    main()
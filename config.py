@@ -0,0 +1,32 @@
+import os
+
+# --- Configuration Objects ---
+# Select one with the APP_CONFIG environment variable (development, production, testing).
+
+class Config:
+    SECRET_KEY = os.environ.get('SECRET_KEY', 'your_super_secret_key_here_for_sessions')
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///new_expense_tracker.db')
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Check pooled connections before use so workers recover from dropped connections
+    SQLALCHEMY_ENGINE_OPTIONS = {'pool_pre_ping': True}
+    # Years of expenses kept in the hot table (including the current year); older ones are archived
+    ARCHIVE_HORIZON_YEARS = int(os.environ.get('ARCHIVE_HORIZON_YEARS', 2))
+    DEBUG = False
+    TESTING = False
+
+class DevelopmentConfig(Config):
+    DEBUG = True
+
+class ProductionConfig(Config):
+    # Never fall back to the hard-coded development key in production
+    SECRET_KEY = os.environ.get('SECRET_KEY')
+
+class TestingConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = os.environ.get('TEST_DATABASE_URL', 'sqlite:///:memory:')
+
+config_by_name = {
+    'development': DevelopmentConfig,
+    'production': ProductionConfig,
+    'testing': TestingConfig,
+}
@@ -0,0 +1,117 @@
+"""Upgrading databases created before amounts were stored as integer paise."""
+import sqlite3
+
+import pytest
+
+import app as m
+
+# Schema as created by the Numeric(10, 2) models
+LEGACY_SCHEMA = '''
+CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR(80) NOT NULL UNIQUE,
+    password_hash VARCHAR(128) NOT NULL, email VARCHAR(120) UNIQUE, created_at DATETIME);
+CREATE TABLE categories (id INTEGER PRIMARY KEY, name VARCHAR(100) NOT NULL,
+    user_id INTEGER REFERENCES users(id) ON DELETE CASCADE, created_at DATETIME,
+    CONSTRAINT _name_user_uc UNIQUE (name, user_id));
+CREATE TABLE expenses (id INTEGER NOT NULL, user_id INTEGER NOT NULL, category_id INTEGER,
+    amount NUMERIC(10, 2) NOT NULL, date DATE {date_null}, description TEXT, created_at DATETIME,
+    PRIMARY KEY (id), CONSTRAINT positive_amount CHECK (amount > 0));
+CREATE TABLE bills (id INTEGER NOT NULL, user_id INTEGER NOT NULL, category_id INTEGER,
+    amount NUMERIC(10, 2) NOT NULL, due_date DATE NOT NULL, description TEXT, is_paid BOOLEAN,
+    created_at DATETIME, PRIMARY KEY (id));
+INSERT INTO users VALUES (1, 'u', 'h', NULL, NULL);
+INSERT INTO bills VALUES (1, 1, NULL, 99.99, '2024-02-01', 'bill', 0, NULL);
+'''
+
+def make_legacy_db(path, expenses, date_null='NOT NULL'):
+    conn = sqlite3.connect(path)
+    conn.executescript(LEGACY_SCHEMA.format(date_null=date_null))
+    conn.executemany(
+        "INSERT INTO expenses (id, user_id, amount, date, description) VALUES (?, 1, ?, ?, ?)", expenses
+    )
+    conn.commit()
+    return conn
+
+def tables(conn):
+    return {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+def columns(conn, table):
+    return [row[1] for row in conn.execute(f'PRAGMA table_info({table})')]
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'legacy.db')
+
+@pytest.fixture
+def app(db_path):
+    return m.create_app('testing', {'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + db_path})
+
+def test_migrates_amounts_to_paise(app, db_path):
+    conn = make_legacy_db(db_path, [
+        (1, 10.1, '2024-01-01', 'a'),
+        (2, 0.29, '2024-01-02', 'b'),
+        (3, 1500, '2024-01-03', 'c'),
+    ])
+    m.init_db(app)
+
+    assert conn.execute('SELECT id, amount_paise FROM expenses ORDER BY id').fetchall() == [
+        (1, 1010), (2, 29), (3, 150000)
+    ]
+    assert conn.execute('SELECT amount_paise FROM bills').fetchall() == [(9999,)]
+    assert 'amount' not in columns(conn, 'expenses')
+    assert not {'expenses_legacy_amount', 'bills_legacy_amount'} & tables(conn)
+
+    # Re-running is a no-op
+    m.init_db(app)
+    assert conn.execute('SELECT COUNT(*) FROM expenses').fetchone() == (3,)
+
+def test_amounts_below_half_a_paisa_become_one_paisa(app, db_path):
+    conn = make_legacy_db(db_path, [(1, 0.004, '2024-01-01', 'tiny')])
+    m.init_db(app)
+    assert conn.execute('SELECT amount_paise FROM expenses').fetchall() == [(1,)]
+
+def test_failed_copy_leaves_original_table_untouched(app, db_path):
+    # A NULL date cannot be copied into the new NOT NULL column
+    conn = make_legacy_db(db_path, [(1, 5, '2024-01-01', 'ok'), (2, 7, None, 'bad')], date_null='')
+
+    with pytest.raises(Exception):
+        m.init_db(app)
+
+    assert 'amount' in columns(conn, 'expenses')
+    assert 'expenses_legacy_amount' not in tables(conn)
+    assert conn.execute('SELECT COUNT(*) FROM expenses').fetchone() == (2,)
+
+def test_resumes_from_leftover_legacy_table(app, db_path):
+    conn = make_legacy_db(db_path, [(1, 12.5, '2024-01-01', 'stranded')])
+    # State left by an interrupted migration: rows renamed away, empty new table
+    conn.execute('ALTER TABLE expenses RENAME TO expenses_legacy_amount')
+    conn.execute('CREATE TABLE expenses (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, category_id INTEGER, '
+                 'amount_paise BIGINT NOT NULL, date DATE NOT NULL, description TEXT, created_at DATETIME)')
+    conn.commit()
+
+    m.init_db(app)
+
+    assert conn.execute('SELECT id, amount_paise, description FROM expenses').fetchall() == [(1, 1250, 'stranded')]
+    assert 'expenses_legacy_amount' not in tables(conn)
+
+def test_refuses_to_resume_over_existing_rows(app, db_path):
+    conn = make_legacy_db(db_path, [(1, 12.5, '2024-01-01', 'stranded')])
+    conn.execute('CREATE TABLE expenses_legacy_amount AS SELECT * FROM expenses')
+    conn.execute('DROP TABLE expenses')
+    conn.execute('CREATE TABLE expenses (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, category_id INTEGER, '
+                 'amount_paise BIGINT NOT NULL, date DATE NOT NULL, description TEXT, created_at DATETIME)')
+    conn.execute("INSERT INTO expenses VALUES (2, 1, NULL, 100, '2024-05-01', 'new', NULL)")
+    conn.commit()
+
+    with pytest.raises(RuntimeError, match='merge them by hand'):
+        m.init_db(app)
+    assert conn.execute('SELECT COUNT(*) FROM expenses_legacy_amount').fetchone() == (1,)
+
+def test_requests_fail_fast_until_migrated(app, db_path):
+    make_legacy_db(db_path, [(1, 10, '2024-01-01', 'a')])
+    client = app.test_client()
+
+    with pytest.raises(RuntimeError, match='init-db'):
+        client.get('/api/expense_data')
+
+    m.init_db(app)
+    assert client.get('/api/expense_data').status_code == 302  # redirected to login